@@ -1,46 +1,120 @@
 import streamlit as st
 import pandas as pd
-import plotly.express as px
-from utils import load_data, append_row, compute_vacation_total, infer_seniority
+import numpy as np
+from utils import load_data, append_row, filter_employees, compute_vacation_total, infer_seniority
 from datetime import date
 
+# plotly is imported inside the figure builders, so module import stays light
+# and cache hits on the figures never touch plotly.express
+
 st.set_page_config(page_title="HR Tool", layout="wide", page_icon="🧑‍💼")
 
+# Above this many points, draw with WebGL and skip per-point box markers
+WEBGL_MIN_ROWS = 1000
+# Rows sent to the browser per page of the filtered data table
+TABLE_PAGE_ROWS = 1000
+
 @st.cache_data
 def get_data():
     return load_data()
 
+@st.cache_data
+def jitter_for(n: int, seed: int = 0) -> np.ndarray:
+    """Deterministic age jitter for n points, stable across reruns."""
+    return np.random.default_rng(seed).normal(0, 0.2, n).astype(np.float32)
+
+@st.cache_data(max_entries=32)
+def fig1_json(department, canton, age_range=None):
+    """Age box plot per department for the filtered subset, as figure JSON."""
+    import plotly.express as px
+    vis_df = filter_employees(get_data(), department, canton, age_range)
+    many_rows = len(vis_df) > WEBGL_MIN_ROWS
+    # only the plotted columns, in narrow dtypes, get serialized to the browser
+    plot_df = vis_df[["Department", "Age"]]
+    fig = px.box(plot_df, x="Department", y="Age",
+                 points="outliers" if many_rows else "all",
+                 title="Age distribution per Department",
+                 labels={"Age": "Age (years)"})
+    return fig.to_json()
+
+@st.cache_data(max_entries=32)
+def fig2_json(department, canton, age_range=None):
+    """Workload-by-age scatter for the filtered subset, as figure JSON."""
+    import plotly.express as px
+    vis_df = filter_employees(get_data(), department, canton, age_range)
+    many_rows = len(vis_df) > WEBGL_MIN_ROWS
+    # jitter age a little for visualization
+    age_jitter = vis_df["Age"].to_numpy(dtype=np.float32) + jitter_for(len(vis_df))
+    plot_df = vis_df[["Age", "Department", "workload_frac", "First Name", "Last Name", "Workload"]]
+    scatter_df = plot_df.assign(age_jitter=age_jitter)
+    fig = px.scatter(scatter_df, x="age_jitter", y="workload_frac", color="Department",
+                     render_mode="webgl" if many_rows else "svg",
+                     custom_data=["First Name", "Last Name", "Workload", "Age"],
+                     title="Workload (fraction) by Age",
+                     labels={"workload_frac": "Workload (fraction)", "age_jitter": "Age"})
+    # one packed customdata array per trace instead of a column per hover field
+    fig.update_traces(hovertemplate="%{customdata[0]} %{customdata[1]}<br>"
+                                    "%{fullData.name} — %{customdata[2]}<br>"
+                                    "Age: %{customdata[3]}<extra></extra>")
+    return fig.to_json()
+
+@st.cache_data(max_entries=32)
+def fig3_json(department, canton, age_range=None):
+    """Hires per year for the filtered subset (counted server-side), as figure JSON."""
+    import plotly.graph_objects as go
+    vis_df = filter_employees(get_data(), department, canton, age_range)
+    years = vis_df["Hire Date"].dt.year.dropna().to_numpy(dtype=np.int16)
+    years, hires = np.unique(years, return_counts=True)
+    fig = go.Figure(go.Bar(x=years, y=hires))
+    fig.update_layout(title="Total Hires Per Year", height=300,
+                      xaxis_title="Year", yaxis_title="Hires")
+    return fig.to_json()
+
+@st.cache_data
+def get_filter_options():
+    """Distinct filter values and age bounds, computed once per data version."""
+    df = get_data()
+    return {
+        "depts": sorted(df["Department"].cat.categories),
+        "cantons": sorted(df["Residence (Canton)"].cat.categories),
+        "age_min": int(df["Age"].min()),
+        "age_max": int(df["Age"].max()),
+    }
+
+def clear_data_caches():
+    """Drop every cache derived from the dataset after it changes on disk."""
+    for cached in (get_data, get_filter_options, fig1_json, fig2_json, fig3_json):
+        cached.clear()
+
 def main():
     st.title("HR Tool — Dashboard & Employee Manager")
     st.markdown("This is a multi-tab internal HR dashboard with visualizations around existing employees, a form to add employees. " 
                 "In the future, a chatbot to ask direct questions about employees or internal regulations will be added.")
 
     df = get_data()
+    opts = get_filter_options()
     tabs = st.tabs(["Visualizations", "Add Employee", "Future (Chatbot)"])
 
     # -------------------------
     # Tab 1: Visualizations
     # -------------------------
     with tabs[0]:
+        import plotly.io as pio
         st.header("Visualizations")
 
         # Filters
         with st.sidebar:
             st.header("Filters")
-            depts = ["All"] + sorted(df["Department"].dropna().unique().tolist())
+            depts = ["All"] + opts["depts"]
             selected_dept = st.selectbox("Department", depts, index=0)
-            cantons = ["All"] + sorted(df["Residence (Canton)"].dropna().unique().tolist())
+            cantons = ["All"] + opts["cantons"]
             selected_canton = st.selectbox("Canton", cantons, index=0)
-            #min_age, max_age = int(df["Age"].min()), int(df["Age"].max())
+            #min_age, max_age = opts["age_min"], opts["age_max"]
             #age_range = st.slider("Age range", min_age, max_age, (min_age, max_age))
 
         # Apply filters
-        vis_df = df.copy()
-        if selected_dept != "All":
-            vis_df = vis_df[vis_df["Department"] == selected_dept]
-        if selected_canton != "All":
-            vis_df = vis_df[vis_df["Residence (Canton)"] == selected_canton]
-        #vis_df = vis_df[(vis_df["Age"] >= age_range[0]) & (vis_df["Age"] <= age_range[1])]
+        vis_df = filter_employees(df, selected_dept, selected_canton)
+        #vis_df = filter_employees(df, selected_dept, selected_canton, age_range)
 
         # Show counts
         cols = st.columns(3)
@@ -57,9 +131,7 @@ def main():
         if vis_df.empty:
             st.info("No data for selected filters.")
         else:
-            fig1 = px.box(vis_df, x="Department", y="Age", points="all",
-                          title="Age distribution per Department",
-                          labels={"Age": "Age (years)"})
+            fig1 = pio.from_json(fig1_json(selected_dept, selected_canton))
             st.plotly_chart(fig1, width="content")
 
         # 2) Workload by age (scatter)
@@ -67,22 +139,7 @@ def main():
         if vis_df.empty:
             st.info("No data for selected filters.")
         else:
-            # normalize workload to numeric fraction if stored as '80%'
-            def workload_to_float(x):
-                if isinstance(x, str) and x.endswith("%"):
-                    return float(x.strip("%"))/100.0
-                try:
-                    return float(x)
-                except:
-                    return None
-            vis_df["workload_frac"] = vis_df["Workload"].apply(workload_to_float)
-            # jitter age a little for visualization
-            import numpy as np
-            jitter = np.random.normal(0, 0.2, size=len(vis_df))
-            fig2 = px.scatter(vis_df, x="Age", y="workload_frac", color="Department",
-                              hover_data=["First Name", "Last Name", "Department", "Workload"],
-                              title="Workload (fraction) by Age",
-                              labels={"workload_frac": "Workload (fraction)", "Age":"Age"})
+            fig2 = pio.from_json(fig2_json(selected_dept, selected_canton))
             st.plotly_chart(fig2, width="content")
 
         # 3) General age distribution
@@ -98,16 +155,16 @@ def main():
         if vis_df.empty:
             st.info("No data for selected filters")
         else:
-            vis_df['Hire Date'] = pd.to_datetime(vis_df['Hire Date'], errors='coerce')
-            hires_per_year = vis_df['Hire Date'].dt.year.value_counts().sort_index()
-            hires_df = hires_per_year.reset_index()
-            hires_df.columns = ["Year", "Hires"]
-            fig3 = px.bar(hires_df, x="Year", y="Hires", title="Total Hires Per Year", height=300)
+            fig3 = pio.from_json(fig3_json(selected_dept, selected_canton))
             st.plotly_chart(fig3, width="content")
 
-        # Show filtered table option
-        with st.expander("Show filtered data table"):
-            st.dataframe(vis_df.reset_index(drop=True))
+        # Show filtered table option; only serialized while toggled on, one page at a time
+        if st.checkbox("Show filtered data table", key="show_tbl"):
+            offset = 0
+            if len(vis_df) > TABLE_PAGE_ROWS:
+                offset = st.number_input("First row", min_value=0, max_value=len(vis_df) - 1,
+                                         value=0, step=TABLE_PAGE_ROWS)
+            st.dataframe(vis_df.iloc[offset:offset + TABLE_PAGE_ROWS], hide_index=True)
 
     # -------------------------
     # Tab 2: Add Employee
@@ -120,22 +177,25 @@ def main():
             c1, c2 = st.columns(2)
             first_name = c1.text_input("First name", "")
             last_name = c2.text_input("Last name", "")
-            canton = st.selectbox("Residence (Canton)", sorted(df["Residence (Canton)"].unique()))
-            department = st.selectbox("Department", sorted(df["Department"].unique()))
+            canton = st.selectbox("Residence (Canton)", opts["cantons"])
+            department = st.selectbox("Department", opts["depts"])
             age = st.number_input("Age", min_value=16, max_value=100, value=30)
             workload_options = ["60%", "70%", "80%", "90%", "100%"]
             workload = st.selectbox("Workload", workload_options, index=4)
             seniority = st.selectbox("Seniority Level", ["Auto-suggest"] + ["Junior", "Mid", "Senior", "Manager", "Director"])
             hire_date = st.date_input("Hire date", value=date.today())
-            # compute vacation total
-            vacation_total = compute_vacation_total(workload)
-            vacation_taken = st.number_input("Vacation days taken", min_value=0, max_value=vacation_total, value=0)
+            # upper bound is the 100% entitlement; checked against the workload on submit
+            vacation_taken = st.number_input("Vacation days taken", min_value=0,
+                                             max_value=compute_vacation_total("100%"), value=0)
 
             submitted = st.form_submit_button("Add employee")
 
         if submitted:
+            vacation_total = compute_vacation_total(workload)
             if not first_name or not last_name:
                 st.error("First and last name are required.")
+            elif vacation_taken > vacation_total:
+                st.error(f"Vacation days taken cannot exceed {vacation_total} days at {workload} workload.")
             else:
                 # if auto-suggest selected, infer
                 if seniority == "Auto-suggest":
@@ -156,11 +216,16 @@ def main():
                     append_row(new_row)
                     st.success(f"Added {first_name} {last_name} to dataset.")
                     st.json(new_row)
-                    # Refresh cached data
-                    st.rerun()
+                    # Refresh cached data; the dashboard picks it up on the next rerun
+                    clear_data_caches()
+                    st.session_state.setdefault("pending_rows", []).append(new_row)
                 except Exception as e:
                     st.error(f"Failed to append row: {e}")
 
+        if st.session_state.get("pending_rows"):
+            st.subheader("Added this session")
+            st.dataframe(pd.DataFrame(st.session_state["pending_rows"]), hide_index=True)
+
     # -------------------------
     # Tab 3: Future (Chatbot)
     # -------------------------
@@ -1,55 +1,168 @@
 # utils.py
+import csv
+import numbers
+from functools import lru_cache
 from pathlib import Path
 import pandas as pd
-from datetime import datetime
+from datetime import date, datetime
 import numpy as np
 
 DATA_PATH = Path("data/swiss_hr_dataset.csv")
 
+# Narrow dtypes: small-range integers as int8, low-cardinality text as category
+COLUMN_DTYPES = {
+    "Age": "int8",
+    "Vacation Days Total": "int8",
+    "Vacation Days Taken": "int8",
+    "Department": "category",
+    "Residence (Canton)": "category",
+    "Seniority Level": "category",
+    "Workload": "category",
+}
+
 def load_data():
     """Load HR dataset from CSV (returns DataFrame)."""
-    df = pd.read_csv(DATA_PATH, parse_dates=["Hire Date"], dayfirst=False)
+    # pyarrow's multi-threaded parser (pyarrow ships with streamlit)
+    df = pd.read_csv(DATA_PATH, engine="pyarrow", dtype=COLUMN_DTYPES, parse_dates=["Hire Date"])
+    # numeric workload fraction (stored as '80%'), parsed once per category
+    workload = df["Workload"]
+    frac = pd.to_numeric(workload.cat.categories.astype(str).str.rstrip("%"), errors="coerce") / 100.0
+    codes = workload.cat.codes.to_numpy()
+    frac = np.asarray(frac, dtype=np.float32)
+    df["workload_frac"] = np.where(codes >= 0, frac[codes], np.float32(np.nan))
     return df
 
+def _equals(col, value):
+    """Boolean NumPy mask of col == value; compares codes for categoricals."""
+    if isinstance(col.dtype, pd.CategoricalDtype):
+        if value not in col.cat.categories:
+            return np.zeros(len(col), dtype=bool)
+        return col.cat.codes.to_numpy() == col.cat.categories.get_loc(value)
+    return col.to_numpy() == value
+
+def filter_employees(df, department="All", canton="All", age_range=None):
+    """
+    Return the rows of df matching the sidebar filters.
+    Builds one combined NumPy mask (no index alignment) and slices once.
+    (df.query was considered: it re-parses the expression on every call and
+    numexpr can't evaluate the categorical comparisons, so it is slower here.)
+    """
+    mask = np.ones(len(df), dtype=bool)
+    if department != "All":
+        mask &= _equals(df["Department"], department)
+    if canton != "All":
+        mask &= _equals(df["Residence (Canton)"], canton)
+    if age_range is not None:
+        age = df["Age"].to_numpy()
+        mask &= (age >= age_range[0]) & (age <= age_range[1])
+    return df.loc[mask]
+
 def save_data(df):
     """Save DataFrame to CSV (overwrite)."""
     df.to_csv(DATA_PATH, index=False)
 
 def append_row(row_dict):
-    """Append a single row (dict) to the CSV safely."""
-    df = load_data()
-    new_df = pd.DataFrame([row_dict])
-    # Ensure Hire Date column is ISO formatted in CSV
-    if "Hire Date" in new_df.columns:
-        new_df["Hire Date"] = pd.to_datetime(new_df["Hire Date"]).dt.date
-    df = pd.concat([df, new_df], ignore_index=True)
-    save_data(df)
+    """Append a single row (dict) to the CSV without rewriting the file."""
+    row = dict(row_dict)
+    # Match the 'YYYY-MM-DD HH:MM:SS' format of the existing Hire Date values
+    if row.get("Hire Date") is not None:
+        row["Hire Date"] = pd.Timestamp(row["Hire Date"]).isoformat(sep=" ")
+    with open(DATA_PATH, newline="", encoding="utf-8") as f:
+        fieldnames = next(csv.reader(f))
+    with open(DATA_PATH, "a", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=fieldnames, lineterminator="\n")
+        writer.writerow(row)
 
-def compute_vacation_total(workload_pct):
-    """
-    Compute vacation days total scaling linearly with workload:
-    max 25 days at 100%. workload_pct like '60%' or 0.6 or int 60.
-    Returns integer number of days.
-    """
+@lru_cache(maxsize=None)
+def _vacation_total_scalar(workload_pct):
     # normalize to fraction
     if isinstance(workload_pct, str) and workload_pct.endswith("%"):
         frac = float(workload_pct.strip("%")) / 100.0
-    elif isinstance(workload_pct, (int, float)) and workload_pct > 1:
+    elif (isinstance(workload_pct, numbers.Real) and not isinstance(workload_pct, bool)
+          and workload_pct > 1):
         frac = float(workload_pct) / 100.0
     else:
         frac = float(workload_pct)
     total = round(25 * frac)
     return int(total)
 
+def _pct_string_fraction(strs):
+    # '%'-suffixed strings are percentages, other strings already fractions;
+    # empty or unparseable strings give NaN
+    is_pct = np.char.endswith(strs, "%")
+    digits = np.char.rstrip(strs, "%")
+    try:
+        vals = digits.astype(float)
+    except ValueError:
+        vals = pd.to_numeric(digits.astype(object), errors="coerce").astype(float)
+    return np.where(is_pct, vals / 100.0, vals)
+
+def _numeric_fraction(vals):
+    # numbers > 1 are percentages, the rest already fractions
+    vals = vals.astype(float)
+    return np.where(vals > 1, vals / 100.0, vals)
+
+def _workload_fraction(arr):
+    """Workload fraction per element of a 1-d object array; NaN where missing or unparseable."""
+    # dispatch on content, classify per element only when mixed
+    missing = pd.isna(arr)
+    kind = pd.api.types.infer_dtype(arr, skipna=True)
+    if kind == "string":
+        return _pct_string_fraction(np.where(missing, "", arr).astype(str))
+    if kind in ("integer", "floating", "mixed-integer-float", "boolean", "empty"):
+        return _numeric_fraction(pd.to_numeric(arr, errors="coerce"))
+    is_str = np.fromiter((isinstance(x, str) for x in arr), dtype=bool, count=len(arr))
+    frac = np.full(len(arr), np.nan)
+    frac[is_str] = _pct_string_fraction(arr[is_str].astype(str))
+    frac[~is_str] = _numeric_fraction(pd.to_numeric(arr[~is_str], errors="coerce"))
+    return frac
+
+def compute_vacation_total(workload_pct):
+    """
+    Compute vacation days total scaling linearly with workload:
+    max 25 days at 100%. workload_pct like '60%' or 0.6 or int 60.
+    Returns integer number of days, or for array-like input a float array
+    of whole days (NaN where the workload is missing or unparseable).
+    """
+    if np.isscalar(workload_pct):
+        return _vacation_total_scalar(workload_pct)
+    dtype = getattr(workload_pct, "dtype", None)
+    if isinstance(dtype, pd.CategoricalDtype):
+        cat = pd.Categorical(workload_pct)
+        codes, uniques = cat.codes, cat.categories
+        shape = np.shape(workload_pct)
+    else:
+        # plain sequences as object so numpy doesn't stringify mixed numbers
+        arr = np.asarray(workload_pct) if dtype is not None else np.asarray(workload_pct, dtype=object)
+        shape = arr.shape
+        arr = arr.ravel()
+        if arr.dtype.kind in "biuf":
+            return np.rint(25 * _numeric_fraction(arr)).reshape(shape)
+        # few distinct workloads in practice: classify each unique value once
+        codes, uniques = pd.factorize(arr)
+    frac = np.append(_workload_fraction(np.asarray(uniques, dtype=object)), np.nan)[codes]
+    return np.rint(25 * frac).reshape(shape)
+
 def infer_seniority(age, hire_date=None):
     """
     Suggest a seniority level based on age and optionally hire_date.
     (Simple heuristic — editable.)
+    Array-like age/hire_date give an array of levels.
     """
+    if np.ndim(age) or np.ndim(hire_date):
+        return _infer_seniority_array(age, hire_date)
+
     if hire_date is not None:
-        # ensure datetime.date / datetime
+        # accept datetime.date / datetime (incl. pd.Timestamp) or an ISO date or
+        # datetime string such as the 'YYYY-MM-DD HH:MM:SS' values in the CSV
         try:
-            years_at_company = (pd.to_datetime("today") - pd.to_datetime(hire_date)).days / 365.25
+            if isinstance(hire_date, datetime):
+                hd = hire_date.date()
+            elif isinstance(hire_date, date):
+                hd = hire_date
+            else:
+                hd = datetime.fromisoformat(str(hire_date)).date()
+            years_at_company = (date.today() - hd).days / 365.25
         except Exception:
             years_at_company = 0
     else:
@@ -63,4 +176,23 @@ def infer_seniority(age, hire_date=None):
         return "Senior"
     if age < 60 and years_at_company >= 8:
         return "Manager"
-    return "Director"
\ No newline at end of file
+    return "Director"
+
+def _infer_seniority_array(age, hire_date=None):
+    # same rules as the scalar path, first matching condition wins
+    age = np.asarray(age)
+    if hire_date is None:
+        years_at_company = np.zeros(age.shape)
+    else:
+        # unparseable dates become NaT and count as zero years, like the scalar path
+        parsed = pd.to_datetime(np.asarray(hire_date, dtype=object).ravel(), errors="coerce")
+        hd = parsed.to_numpy().astype("datetime64[D]").reshape(np.shape(hire_date))
+        days = (np.datetime64(date.today(), "D") - hd) / np.timedelta64(1, "D")
+        years_at_company = np.where(np.isnat(hd), 0, days / 365.25)
+    conditions = [
+        (age < 28) & (years_at_company < 3),
+        (age < 35) & (years_at_company < 6),
+        (age < 45) & (years_at_company < 12),
+        (age < 60) & (years_at_company >= 8),
+    ]
+    return np.select(conditions, ["Junior", "Mid", "Senior", "Manager"], default="Director")